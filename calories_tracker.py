@@ -1,17 +1,19 @@
 import asyncio
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import datetime as dt
-from decimal import Decimal, InvalidOperation
+from functools import lru_cache
 import logging
+from operator import attrgetter
+import re
 from typing import Optional, Type
+import unicodedata
 
 import pandas as pd
 from telethon.tl.patched import Message
-from unidecode import unidecode
 
 from tel2gsheet import (
     IncomingMessage, Tracker, TelegramConnection, GSheetConnection,
-    load_chat_id, load_sheet_id, logger
+    load_chat_id, load_sheet_id, logger, parse_msg_ids
 )
 
 
@@ -45,28 +47,64 @@ HELP_MESSAGE = (
     "uma linha (i.e., clicando em 'Enter' no teclado)"
 )
 TRACKER_NAME = "calories"
+_DISPATCH_RE = re.compile(r"^\s*(?P<help>\?)\s*$|^(?P<reg>@)|^(?P<skip>#)")
+_SPLIT_RE = re.compile(
+    r"^\s*(\d*\.?\d+(?:\s*/\s*\d*\.?\d+)?)\s*([^\d.,/\s]\D*?|)\s*$"
+)
+_LINE_RE = re.compile(r"^\s*@?\s*(?P<desc>[^-]+?)\s*-\s*(?P<rest>.*?)\s*$")
+_MEAL_RE = re.compile(
+    r"^(?P<qty>[^-]*?)\s*(?:-\s*(?P<date>[^-]*?)\s*(?:-.*)?)?$"
+)
+_REGISTRATION_RE = re.compile(
+    r"^(?P<cals>\d*\.?\d+)\s*(?:cal)?\s*/\s*(?P<qty>[^-]*?)\s*(?:-.*)?$"
+)
 
 
+@lru_cache(maxsize=4096)
 def normalize_text(text: str) -> str:
-    return unidecode(text.lower().strip())
+    return unicodedata.normalize(
+        "NFKD", text.lower().strip()
+    ).encode("ascii", "ignore").decode("ascii")
 
 
-def split_unit(text: str) -> tuple[Decimal, str]:
-    for i, e in list(enumerate(text))[::-1]:
-        if e.isnumeric():
-            val = text[:i+1].strip()
-            un = text[i+1:].strip()
-            if "/" in val:
-                p, q = val.split("/")
-                return Decimal(p)/Decimal(q), un
-            return Decimal(val), un
-    raise ValueError("Couldn't find a pair of value and unit of measurement")
+def build_norm_index(
+    registrations: list[list[str]]
+) -> dict[tuple[str, str], tuple[str, str]]:
+    norm_index: dict[tuple[str, str], tuple[str, str]] = {}
+    for d, un in registrations:
+        norm_index.setdefault((normalize_text(d), normalize_text(un)), (d, un))
+    return norm_index
+
+
+def match_line(pattern: re.Pattern, line: str) -> tuple[str, re.Match]:
+    m = _LINE_RE.match(line)
+    rest = pattern.match(m["rest"]) if m else None
+    if rest is None:
+        raise ValueError(f"Couldn't parse line '{line}'")
+    return m["desc"], rest
+
+
+def split_unit(text: str) -> tuple[float, str]:
+    m = _SPLIT_RE.match(text)
+    if m is None:
+        raise ValueError(
+            "Couldn't find a pair of value and unit of measurement"
+        )
+    val, un = m.group(1), m.group(2)
+    if "/" in val:
+        p, q = val.split("/")
+        return float(p)/float(q), un
+    return float(val), un
+
+
+def num_fmt(x: float) -> str:
+    return f"{x:.15g}"
 
 
 @dataclass
 class CaloriesStats:
-    today_calories: Decimal
-    monthly_calories: Decimal
+    today_calories: float
+    monthly_calories: float
     monthly_mean: float
     monthly_stddev: float
 
@@ -105,25 +143,24 @@ class CalorieRegistration(IncomingMessage):
     date: dt.date
     chat_id: int
     description: str
-    quantity: Decimal
+    quantity: float
     unit: str
-    calories: Decimal
+    calories: float
 
     def __str__(self):
-        return (f"{self.description}: {self.calories} cal per {self.quantity} "
-                f"{self.unit}")
+        return (f"{self.description}: {self.calories:g} cal per "
+                f"{self.quantity:g} {self.unit}")
 
     @classmethod
-    def parse(cls, msg: Message, registrations = list[list[str, str]]):
-        items = [i.strip() for i in msg.text.lstrip("@").split("-")]
-        desc = items[0]
-        date = msg.date.date()
-        cals = Decimal(items[1].split("/")[0].replace("cal", "").strip())
-        value, unit = split_unit(items[1].split("/")[1].strip())
-        if (desc, unit) in registrations:
+    def parse(cls, line: str, msg_id: int, msg_date: dt.date,
+              chat_id: int, reg_keys: set[tuple[str, str]]):
+        desc, m = match_line(_REGISTRATION_RE, line)
+        cals = float(m["cals"])
+        value, unit = split_unit(m["qty"])
+        if (desc, unit) in reg_keys:
             raise ValueError(f"Registration for item '{desc}', unit '{unit}' "
                              "already exists")
-        return cls(msg.id, date, msg.chat_id, desc, value, unit, cals)
+        return cls(msg_id, msg_date, chat_id, desc, value, unit, cals)
 
 
 @dataclass
@@ -133,9 +170,9 @@ class MealMessage(IncomingMessage):
     date: dt.date
     chat_id: int
     description: str
-    quantity: Optional[Decimal]
+    quantity: Optional[float]
     unit: Optional[str]
-    calories: Optional[Decimal]
+    calories: Optional[float]
 
     def __post_init__(self):
         has_quantity = (self.quantity is not None and self.unit is not None)
@@ -143,8 +180,11 @@ class MealMessage(IncomingMessage):
         assert has_calories or has_quantity
 
     def __str__(self):
-        qty = f" {self.quantity} [{self.unit}]" if self.quantity else ""
-        cals = f" ({self.calories} cal)" if self.calories else ""
+        qty = f" {self.quantity:g} [{self.unit}]" if self.quantity else ""
+        cal = self.calories
+        if isinstance(cal, (int, float)):
+            cal = f"{cal:g}"
+        cals = f" ({cal} cal)" if cal else ""
         date_str = self.date.strftime("%d/%m/%Y")
         return f"{self.description}:{qty}{cals} - {date_str}"
 
@@ -155,36 +195,35 @@ class MealMessage(IncomingMessage):
         cal = df[
             (df["Id Mensagem"] == str(self.id)) &
             (df["Comida"] == self.description) &
-            (df["Quantidade"] == str(self.quantity)) &
+            (df["Quantidade"] == num_fmt(self.quantity)) &
             (df["Unidade"] == self.unit)
-        ]["Calorias"].values.tolist()
+        ]["Calorias"].to_numpy(copy=False).tolist()
         if cal:
             self.calories = cal[0]
         return
 
     @classmethod
-    def parse(cls, msg: Message, registrations = list[list[str, str]]):
-        items = [i.strip() for i in msg.text.split("-")]
-        desc = items[0]
-        value, unit = split_unit(items[1])
-        date = (msg.date.date() if len(items) < 3 else
-                dt.datetime.strptime(items[2], "%d/%m/%Y").date())
+    def parse(cls, line: str, msg_id: int, msg_date: dt.date,
+              chat_id: int,
+              norm_index: dict[tuple[str, str], tuple[str, str]]):
+        desc, m = match_line(_MEAL_RE, line)
+        value, unit = split_unit(m["qty"])
+        date = (msg_date if not m["date"] else
+                dt.datetime.strptime(m["date"], "%d/%m/%Y").date())
         if unit.upper() in ("CAL", "CALS"):
-            return cls(msg.id, date, msg.chat_id, desc, None, None, value)
+            return cls(msg_id, date, chat_id, desc, None, None, value)
         else:
-            normalized = [[d, un] for d, un in registrations
-                          if normalize_text(d) == normalize_text(desc) and
-                          normalize_text(un) == normalize_text(unit)]
-            if not normalized:
+            hit = norm_index.get((normalize_text(desc), normalize_text(unit)))
+            if hit is None:
                 raise MissingRegistrationError("Missing registration for item "
                                                f" '{desc}', unit '{unit}'")
-            n_desc, n_un = normalized[0][0], normalized[0][1]
+            n_desc, n_un = hit
             return cls(
-                msg.id, date, msg.chat_id, n_desc, value, n_un, None
+                msg_id, date, chat_id, n_desc, value, n_un, None
             )
 
 
-@dataclass
+@dataclass(slots=True)
 class CaloriesTracker(Tracker):
     telegram: TelegramConnection
     gsheet: GSheetConnection
@@ -193,13 +232,33 @@ class CaloriesTracker(Tracker):
     name: str = TRACKER_NAME
     help_message = HELP_MESSAGE
     text_header = TEXT_HEADER
-
-    def __post_init__(self):
-        self.to_upload: list[MealMessage] = []
-        self.new_registrations: list[CalorieRegistration] = []
-        self.missing_registration: list[MissingRegistration] = []
-        self.failed_to_parse: list[Message] = []
-        self.asked_for_help: list[Message] = []
+    to_upload: list[MealMessage] = field(
+        init=False, repr=False, default_factory=list
+    )
+    new_registrations: list[CalorieRegistration] = field(
+        init=False, repr=False, default_factory=list
+    )
+    missing_registration: list[MissingRegistrationMessage] = field(
+        init=False, repr=False, default_factory=list
+    )
+    failed_to_parse: list[Message] = field(
+        init=False, repr=False, default_factory=list
+    )
+    asked_for_help: list[Message] = field(
+        init=False, repr=False, default_factory=list
+    )
+    entries_df: Optional[pd.DataFrame] = field(
+        init=False, repr=False, default=None
+    )
+    registrations_df: Optional[pd.DataFrame] = field(
+        init=False, repr=False, default=None
+    )
+    processed_msgs: Optional[frozenset[int]] = field(
+        init=False, repr=False, default=None
+    )
+    _loop: Optional[asyncio.AbstractEventLoop] = field(
+        init=False, repr=False, default=None
+    )
 
     @classmethod
     def from_yaml(cls, file_path: str = "settings.yaml"):
@@ -210,81 +269,98 @@ class CaloriesTracker(Tracker):
         sheet_id = load_sheet_id(TRACKER_NAME, file_path)
         return cls(tel, gsheet, chat_id, sheet_id)
 
-    def fetch_telegram_messages(self) -> list[Message]:
+    async def fetch_telegram_messages(self) -> list[Message]:
         logger.info("Fetching messages from chat %d", self.chat_id)
-        return asyncio.get_event_loop().run_until_complete(
-            self.telegram.fetch_msgs(self.chat_id)
-        )
+        return await self.telegram.fetch_msgs(self.chat_id)
 
-    def send_telegram_message(
-            self, chat_id: int, txt: str, reply_to: Optional[int]
+    async def send_telegram_messages(
+            self, msgs: list[tuple[int, str, Optional[int]]]
     ):
-        logger.info("Sending to chat %d:\n%s", chat_id, txt)
-        asyncio.get_event_loop().run_until_complete(
-            self.telegram.send_msg(chat_id, txt, reply_to)
-        )
+        for chat_id, txt, _ in msgs:
+            logger.info("Sending to chat %d:\n%s", chat_id, txt)
+        await self.telegram.send_msgs(msgs)
 
-    def process_received_messages(self):
+    def process_received_messages(self, msgs: list[Message]):
         logger.info("Processing new Telegram messages")
-        msgs = [m for m in self.fetch_telegram_messages()
-                if m.id not in self.processed_msgs]
+        msgs = [m for m in msgs if m.id not in self.processed_msgs]
         if not msgs or msgs[0].text.startswith(TEXT_HEADER):
             logger.info("No new messages")
             return ([], [])
-        msgs = sorted(
-            msgs,
-            key=lambda m: 0 if m.text and m.text.startswith("@") else 1
-        )
+        regs, meals = [], []
+        for m in msgs:
+            text = m.text
+            (regs if text and text[:1] == "@" else meals).append(m)
+        msgs = regs + meals
 
         registrations = self.registrations_df[
             ["Comida", "Unidade"]
-        ].values.tolist()
+        ].to_numpy(copy=False).tolist()
+        reg_keys = {(d, un) for d, un in registrations}
+        norm_index = build_norm_index(registrations)
 
-        help_wanted: list[int] = []
+        help_wanted: list[Message] = []
         answered: set[int] = set()
         logger.info("Parsing messages")
         for msg in msgs:
             original_text = msg.text
             if msg.is_reply:
                 answered.add(msg.reply_to.reply_to_msg_id)
-            if msg.text is None or msg.text.startswith("#"):
+            if original_text is None:
                 continue
-            elif msg.text.strip() == "?":
+            match = _DISPATCH_RE.match(original_text)
+            kind = match.lastgroup if match else "meal"
+            if kind == "skip":
+                continue
+            elif kind == "help":
                 help_wanted.append(msg)
             else:
+                msg_date = msg.date.date()
                 for line in original_text.splitlines():
-                    msg.text = line
+                    line = line.strip()
+                    if not line:
+                        continue
                     try:
-                        if msg.text.startswith("@"):
-                            reg = CalorieRegistration.parse(msg, registrations)
+                        if line[0] == "@":
+                            reg = CalorieRegistration.parse(
+                                line, msg.id, msg_date, msg.chat_id,
+                                reg_keys
+                            )
                             self.new_registrations.append(reg)
-                            registrations.append(
-                                [reg.description, reg.unit]
+                            reg_keys.add((reg.description, reg.unit))
+                            norm_index.setdefault(
+                                (normalize_text(reg.description),
+                                 normalize_text(reg.unit)),
+                                (reg.description, reg.unit)
                             )
                         else:
                             self.to_upload.append(
-                                MealMessage.parse(msg, registrations)
+                                MealMessage.parse(
+                                    line, msg.id, msg_date, msg.chat_id,
+                                    norm_index
+                                )
                             )
                     except MissingRegistrationError as e:
-                        logger.info("Error parsing message: '%s'", msg.text)
+                        logger.info("Error parsing message: '%s'", line)
                         logger.info(e)
                         self.missing_registration.append(
                             MissingRegistrationMessage(
-                                msg.id, msg.date.date(), msg.chat_id, msg.text
+                                msg.id, msg_date, msg.chat_id, line
                             )
                         )
-                    except (IndexError, InvalidOperation, IndexError) as e:
-                        logger.error("Error parsing message: '%s'", msg.text)
+                    except (IndexError, ValueError, ZeroDivisionError) as e:
+                        logger.error("Error parsing message: '%s'", line)
                         logger.debug(e)
                         self.failed_to_parse.append(msg)
 
-        self.to_upload.reverse()
-        self.new_registrations.reverse()
-        self.missing_registration.reverse()
-        self.failed_to_parse.reverse()
+        self.to_upload.sort(key=attrgetter("id"))
+        self.new_registrations.sort(key=attrgetter("id"))
+        self.missing_registration.sort(key=attrgetter("id"))
+        self.failed_to_parse.sort(key=attrgetter("id"))
+        answered &= {msg.id for msg in help_wanted}
         self.asked_for_help.extend(
             [msg for msg in help_wanted if msg.id not in answered]
         )
+        self.asked_for_help.sort(key=attrgetter("id"))
         logger.info("Finished processing new messages")
         return
 
@@ -294,23 +370,16 @@ class CaloriesTracker(Tracker):
         df = self.gsheet.read(self.spreadsheet_id, sheet_name, sheet_range)
         return df
 
-    def fetch_registrations(self) -> pd.DataFrame:
-        sheet_name = "Referência"
-        sheet_range = "A:G"
-        df = self.gsheet.read(self.spreadsheet_id, sheet_name, sheet_range)
-        return df
-
-    def fetch_processed_messages(self) -> set[int]:
-        sheet_name = "Telegram"
-        sheet_range = "A:B"
-        df = self.gsheet.read(self.spreadsheet_id, sheet_name, sheet_range)
-        return {int(i) for i in df["MsgId"].values if i}
-
     def fetch_gsheet_state(self):
         logger.info("Fetching GSheet state")
-        self.entries_df = self.fetch_entries()
-        self.registrations_df = self.fetch_registrations()
-        self.processed_msgs = self.fetch_processed_messages()
+        entries_df, registrations_df, telegram_df = self.gsheet.batch_read(
+            self.spreadsheet_id,
+            [("Acompanhamento", "A:F"), ("Referência", "A:G"),
+             ("Telegram", "A:B")]
+        )
+        self.entries_df = entries_df
+        self.registrations_df = registrations_df
+        self.processed_msgs = parse_msg_ids(telegram_df)
         logger.info("Finished fetching GSheet state")
 
     def clean_local_state(self):
@@ -319,44 +388,41 @@ class CaloriesTracker(Tracker):
         self.missing_registration = []
         self.failed_to_parse = []
         self.asked_for_help = []
-        for attr in ("entries_df", "registrations_df", "processed_msgs"):
-            if hasattr(self, attr):
-                delattr(self, attr)
+        self.entries_df = None
+        self.registrations_df = None
+        self.processed_msgs = None
 
-    def upload_processed_messages(self):
+    def processed_messages_payload(self) -> tuple[str, str, list[list]]:
         sheet_name = "Telegram"
-        sheet_range = "A:B"
         data = (
             [[msg.id, "SUCCESS"] for msg in self.to_upload] +
             [[msg.id, "SUCCESS"] for msg in self.new_registrations] +
             [[msg.id, "FAILURE"] for msg in self.failed_to_parse] +
             [[msg.id, "ASKED_FOR_HELP"] for msg in self.asked_for_help]
         )
-        self.gsheet.write(self.spreadsheet_id, sheet_name, sheet_range, data)
+        return sheet_name, "A:B", data
 
-    def upload_entries(self):
+    def entries_payload(self) -> tuple[str, str, list[list]]:
         cal_formula = ("=INDEX('Referência'!E:E, "
                        'MATCH(CONCAT(INDIRECT(CONCAT("B", ROW())), '
                        'INDIRECT(CONCAT("D", ROW()))), '
                        "'Referência'!F:F, 0))"
                        '*INDIRECT(CONCAT("C", ROW()))')
         sheet_name = "Acompanhamento"
-        sheet_range = "A:F"
         data = []
         for m in self.to_upload:
             data.append([
                 m.date.strftime("%d-%b-%Y"),
                 m.description,
-                str(m.quantity) if m.quantity else "",
+                num_fmt(m.quantity) if m.quantity else "",
                 m.unit,
-                cal_formula if not m.calories else str(m.calories),
+                cal_formula if not m.calories else num_fmt(m.calories),
                 m.id
             ])
-        self.gsheet.write(self.spreadsheet_id, sheet_name, sheet_range, data)
+        return sheet_name, "A:F", data
 
-    def upload_new_registrations(self):
+    def new_registrations_payload(self) -> tuple[str, str, list[list]]:
         sheet_name = "Referência"
-        sheet_range = "A:G"
         data = []
         cal_per_qty = ('=INDIRECT(CONCAT("B", ROW()))'
                        '/INDIRECT(CONCAT("C", ROW()))')
@@ -365,30 +431,41 @@ class CaloriesTracker(Tracker):
         for m in self.new_registrations:
             data.append([
                 m.description,
-                str(m.calories),
-                str(m.quantity),
+                num_fmt(m.calories),
+                num_fmt(m.quantity),
                 m.unit,
                 str(cal_per_qty),
                 key,
                 m.id
             ])
-        self.gsheet.write(self.spreadsheet_id, sheet_name, sheet_range, data)
+        return sheet_name, "A:G", data
 
     def update_gsheet_state(self):
         logger.info("Uploading new data to GSheet")
-        self.upload_entries()
-        self.upload_new_registrations()
-        self.upload_processed_messages()
+        for sheet_name, sheet_range, data in (
+            self.entries_payload(),
+            self.new_registrations_payload(),
+            self.processed_messages_payload()
+        ):
+            if data:
+                self.gsheet.write(
+                    self.spreadsheet_id, sheet_name, sheet_range, data
+                )
         logger.info("Finished uploading to GSheet")
 
-    def send_feedback_messages(self):
+    async def send_feedback_messages(self):
         if not (self.to_upload or self.failed_to_parse or self.asked_for_help):
             return
 
-        df = self.fetch_entries()
+        # Refresh only the entries so the rows just uploaded (and their
+        # computed calories) are visible; the rest of the state is reused
+        self.entries_df = self.fetch_entries()
+        df = self.entries_df
         missing_reg_error = [
             MissingRegistration(v[0], v[1])
-            for v in df[df["Calorias"] == "#N/A"][["Comida", "Unidade"]].values
+            for v in df.loc[
+                df["Calorias"] == "#N/A", ["Comida", "Unidade"]
+            ].to_numpy()
         ]
 
         for msg in self.to_upload:
@@ -396,7 +473,8 @@ class CaloriesTracker(Tracker):
         ok_source = self.to_upload + self.new_registrations
         ok_msgs = "\n\n".join([f"\t-> {str(m)}" for m in ok_source])
         nok_msgs = "\n\n".join(
-            set(f"\t-> {m.text}" for m in self.failed_to_parse)
+            f"\t-> {t}"
+            for t in dict.fromkeys(m.text for m in self.failed_to_parse)
         )
         miss_msgs = "\n\n".join([f"\t-> {str(m)}" for m in
                                  self.missing_registration])
@@ -411,8 +489,9 @@ class CaloriesTracker(Tracker):
                       "registro de calorias:")
 
         if ok_msgs:
-            today = dt.datetime.now().date()
-            date_str = dt.datetime.now().strftime("%m/%Y")
+            now = dt.datetime.now()
+            today = now.date()
+            date_str = now.strftime("%m/%Y")
             stats = self.get_monthly_calories(today)
             cals_text = (f"No mês {date_str} (excluindo hoje) foram consumidas "
                          f"{stats.monthly_calories:.2f} calorias "
@@ -432,42 +511,58 @@ class CaloriesTracker(Tracker):
             "\n\n" +
             "Em caso de dúvidas, envie uma mensagem contendo o caractere '?'"
         )
+        to_send: list[tuple[int, str, Optional[int]]] = []
         if ok_msgs or nok_msgs or miss_msgs:
-            self.send_telegram_message(self.chat_id, text, None)
+            to_send.append((self.chat_id, text, None))
         if self.asked_for_help:
             help_msg = self.text_header + self.help_message
-            self.send_telegram_message(
-                self.chat_id, help_msg, self.asked_for_help[-1].id
+            to_send.append(
+                (self.chat_id, help_msg, self.asked_for_help[-1].id)
             )
+        if to_send:
+            await self.send_telegram_messages(to_send)
 
     def get_monthly_calories(
         self, ref_date: dt.date
     ) -> CaloriesStats:
-        self.fetch_gsheet_state()
-        df = self.entries_df.copy()
-        df["Calorias"] = pd.to_numeric(df["Calorias"])
-        df["RefDate"] = df["Dia"].apply(
-            lambda d: dt.datetime.strptime(d, "%d-%b-%Y").date()
-        )
-        today_cals = sum(df[df["RefDate"] == ref_date]["Calorias"].values)
+        if self.entries_df is None:
+            self.fetch_gsheet_state()
+        df = self.entries_df
+        cals = pd.to_numeric(df["Calorias"], errors="coerce")
+        ref = pd.to_datetime(df["Dia"], format="%d-%b-%Y").dt.date
         start_of_period = dt.date(ref_date.year, ref_date.month, 1)
-        month_df = df[
-            (df["RefDate"] < ref_date) & (df["RefDate"] >= start_of_period)
-        ][["RefDate", "Calorias"]].groupby("RefDate").sum().reset_index()
-        total = sum(month_df["Calorias"].values)
-        mean = month_df["Calorias"].mean()
-        std = month_df["Calorias"].std()
+        today_mask = ref == ref_date
+        month_mask = (ref < ref_date) & (ref >= start_of_period)
+        today_cals = cals[today_mask].sum()
+        month_cals = cals[month_mask].groupby(ref[month_mask]).sum()
+        total = month_cals.sum()
+        mean = month_cals.mean()
+        std = month_cals.std()
         return CaloriesStats(today_cals, total, mean, std)
 
-    def run(self):
+    async def run_async(self):
         logger.info("Running %s", self.__class__.__name__)
-        self.fetch_gsheet_state()
-        self.process_received_messages()
-        self.update_gsheet_state()
-        self.send_feedback_messages()
+        async with self.telegram.client:
+            msgs, _ = await asyncio.gather(
+                self.fetch_telegram_messages(),
+                asyncio.to_thread(self.fetch_gsheet_state)
+            )
+            self.process_received_messages(msgs)
+            self.update_gsheet_state()
+            await self.send_feedback_messages()
         self.clean_local_state()
         logger.info("Finished running %s", self.__class__.__name__)
 
+    def run(self):
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+        self._loop.run_until_complete(self.run_async())
+
+    def close(self):
+        if self._loop is not None:
+            self._loop.close()
+            self._loop = None
+
 
 def load_and_run_trackers(
     trackers: list[Type[Tracker]],
@@ -480,7 +575,10 @@ def load_and_run_trackers(
     logger.info("Loaded all trackers")
     for tracker in t_objs:
         logger.info("Running tracker %s", tracker.__class__.__name__)
-        tracker.run()
+        try:
+            tracker.run()
+        finally:
+            tracker.close()
     logger.info("Finished running all trackers. Exiting")
 
 
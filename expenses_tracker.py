@@ -1,17 +1,20 @@
 import asyncio
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import datetime as dt
 from decimal import Decimal, InvalidOperation
+from functools import lru_cache
 import logging
+from operator import attrgetter
+import re
 from typing import Optional, Type
+import unicodedata
 
 import pandas as pd
 from telethon.tl.patched import Message
-from unidecode import unidecode
 
 from tel2gsheet import (
     IncomingMessage, Tracker, TelegramConnection, GSheetConnection,
-    load_chat_id, load_sheet_id, logger
+    load_chat_id, load_sheet_id, load_sheet_option, logger, parse_msg_ids
 )
 
 
@@ -30,10 +33,31 @@ HELP_MESSAGE = (
     "20 - Loterica - Aposta Mega Virada - Dinheiro"
 )
 TRACKER_NAME = "expenses"
+MONTH_NAMES = {
+    1: "jan", 2: "fev", 3: "mar", 4: "abr", 5: "mai", 6: "jun", 7: "jul",
+    8: "ago", 9: "set", 10: "out", 11: "nov", 12: "dez"
+}
+_MONTH_RE = re.compile("|".join(map(re.escape, MONTH_NAMES.values())))
+_MONTH_TO_NUM = {v: f"{k:02d}" for k, v in MONTH_NAMES.items()}
+_PARSE_RE = re.compile(
+    r"^\s*(\d+(?:[.,]\d+)?)\s*-\s*([^-]+?)\s*-\s*(.+?)\s*-\s*([^-]+?)"
+    r"(?:\s*-\s*(\d{1,2}/\d{1,2}/\d{4}))?\s*$"
+)
 
 
+@lru_cache(maxsize=4096)
 def normalize_text(text: str) -> str:
-    return unidecode(text.lower().strip())
+    return unicodedata.normalize(
+        "NFKD", text.lower().strip()
+    ).encode("ascii", "ignore").decode("ascii")
+
+
+def dt_fmt(d: dt.date, month_names: dict[int, str] = MONTH_NAMES) -> str:
+    return f"{d.day:02}-{month_names[d.month]}.-{d.year}"
+
+
+def dec_fmt(d: Decimal) -> str:
+    return f"{d:f}".replace(".", ",")
 
 
 @dataclass
@@ -53,37 +77,57 @@ class ExpenseMessage(IncomingMessage):
                 f"{self.date.strftime('%Y-%m-%d')}")
 
     @classmethod
-    def parse(cls, msg: Message, valid_accounts = set[str]):
-        items = [i.strip() for i in msg.text.split("-")]
-        price = Decimal(items[0].replace(",", "."))
-        cp = items[1]
-        desc = items[2]
-        matching_accs = [a for a in valid_accounts 
-                         if normalize_text(a) == normalize_text(items[3])]
-        acc = matching_accs[0]
-        date = (msg.date.date() if len(items) < 5 else
-                dt.datetime.strptime(items[4], "%d/%m/%Y").date())
+    def parse(cls, msg: Message, norm_accounts: dict[str, str]):
+        m = _PARSE_RE.match(msg.text)
+        if m is None:
+            raise ValueError(f"Couldn't parse expense '{msg.text}'")
+        price = Decimal(m.group(1).replace(",", "."))
+        cp = m.group(2)
+        desc = m.group(3)
+        acc = norm_accounts[normalize_text(m.group(4))]
+        date = (msg.date.date() if m.group(5) is None else
+                dt.datetime.strptime(m.group(5), "%d/%m/%Y").date())
         return cls(msg.id, date, msg.chat_id, price, cp, desc, acc)
 
 
-@dataclass
+@dataclass(slots=True)
 class ExpensesTracker(Tracker):
     telegram: TelegramConnection
     gsheet: GSheetConnection
     chat_id: int
     spreadsheet_id: int
     name: str = TRACKER_NAME
-    month_names = {
-        1: "jan", 2: "fev", 3: "mar", 4: "abr", 5: "mai", 6: "jun", 7: "jul",
-        8: "ago", 9: "set", 10: "out", 11: "nov", 12: "dez"
-    }
+    monthly_summary: bool = True
+    month_names = MONTH_NAMES
     help_message = HELP_MESSAGE
     text_header = TEXT_HEADER
-
-    def __post_init__(self):
-        self.to_upload: list[ExpenseMessage] = []
-        self.failed_to_parse: list[Message] = []
-        self.asked_for_help: list[Message] = []
+    to_upload: list[ExpenseMessage] = field(
+        init=False, repr=False, default_factory=list
+    )
+    failed_to_parse: list[Message] = field(
+        init=False, repr=False, default_factory=list
+    )
+    missing_accounts: list[Message] = field(
+        init=False, repr=False, default_factory=list
+    )
+    asked_for_help: list[Message] = field(
+        init=False, repr=False, default_factory=list
+    )
+    entries_df: Optional[pd.DataFrame] = field(
+        init=False, repr=False, default=None
+    )
+    accounts_df: Optional[pd.DataFrame] = field(
+        init=False, repr=False, default=None
+    )
+    processed_msgs: Optional[frozenset[int]] = field(
+        init=False, repr=False, default=None
+    )
+    accounts: Optional[frozenset[str]] = field(
+        init=False, repr=False, default=None
+    )
+    _loop: Optional[asyncio.AbstractEventLoop] = field(
+        init=False, repr=False, default=None
+    )
 
     @classmethod
     def from_yaml(cls, file_path: str = "settings.yaml"):
@@ -92,35 +136,35 @@ class ExpensesTracker(Tracker):
         gsheet = GSheetConnection()
         chat_id = load_chat_id(TRACKER_NAME, file_path)
         sheet_id = load_sheet_id(TRACKER_NAME, file_path)
-        return cls(tel, gsheet, chat_id, sheet_id)
+        monthly_summary = load_sheet_option(
+            TRACKER_NAME, "monthly_summary", True, file_path
+        )
+        return cls(tel, gsheet, chat_id, sheet_id,
+                   monthly_summary=monthly_summary)
 
-    def fetch_telegram_messages(self) -> list[Message]:
+    async def fetch_telegram_messages(self) -> list[Message]:
         logger.info("Fetching messages from chat %d", self.chat_id)
-        return asyncio.get_event_loop().run_until_complete(
-            self.telegram.fetch_msgs(self.chat_id)
-        )
+        return await self.telegram.fetch_msgs(self.chat_id)
 
-    def send_telegram_message(
-            self, chat_id: int, txt: str, reply_to: Optional[int]
+    async def send_telegram_messages(
+            self, msgs: list[tuple[int, str, Optional[int]]]
     ):
-        logger.info("Sending to chat %d:\n%s", chat_id, txt)
-        asyncio.get_event_loop().run_until_complete(
-            self.telegram.send_msg(chat_id, txt, reply_to)
-        )
+        for chat_id, txt, _ in msgs:
+            logger.info("Sending to chat %d:\n%s", chat_id, txt)
+        await self.telegram.send_msgs(msgs)
 
-    def process_received_messages(self):
+    def process_received_messages(self, msgs: list[Message]):
         logger.info("Processing new Telegram messages")
-        msgs = [m for m in self.fetch_telegram_messages()
-                if m.id not in self.processed_msgs]
+        msgs = [m for m in msgs if m.id not in self.processed_msgs]
         if not msgs:
             logger.info("No new messages")
-            return ([], [])
+            return
 
-        accounts = set(self.accounts_df[self.accounts_df["Tipo"].isin(
-            ["Asset", "Liability"]
-        )]["Conta"].values.tolist())
+        norm_accounts = {normalize_text(a): a for a in self.accounts}
+        if not norm_accounts:
+            logger.error("No valid accounts loaded; skipping expense parsing")
 
-        help_wanted: list[int] = []
+        help_wanted: list[Message] = []
         answered: set[int] = set()
         logger.info("Parsing messages")
         for msg in msgs:
@@ -131,19 +175,26 @@ class ExpensesTracker(Tracker):
                 continue
             elif msg.text.strip() == "?":
                 help_wanted.append(msg)
+            elif not norm_accounts:
+                self.missing_accounts.append(msg)
             else:
                 try:
-                    self.to_upload.append(ExpenseMessage.parse(msg, accounts))
-                except (IndexError, InvalidOperation, IndexError) as e:
+                    self.to_upload.append(
+                        ExpenseMessage.parse(msg, norm_accounts)
+                    )
+                except (ValueError, InvalidOperation, KeyError) as e:
                     logger.error("Error parsing message: '%s'", msg.text)
                     logger.debug(e)
                     self.failed_to_parse.append(msg)
 
-        self.to_upload.reverse()
-        self.failed_to_parse.reverse()
+        self.to_upload.sort(key=attrgetter("id"))
+        self.failed_to_parse.sort(key=attrgetter("id"))
+        self.missing_accounts.sort(key=attrgetter("id"))
+        answered &= {msg.id for msg in help_wanted}
         self.asked_for_help.extend(
             [msg for msg in help_wanted if msg.id not in answered]
         )
+        self.asked_for_help.sort(key=attrgetter("id"))
         logger.info("Finished processing new messages")
         return
 
@@ -153,92 +204,91 @@ class ExpensesTracker(Tracker):
         df = self.gsheet.read(self.spreadsheet_id, sheet_name, sheet_range)
         return df
 
-    def fetch_accounts(self) -> pd.DataFrame:
-        sheet_name = "Contas"
-        sheet_range = "B2:C999"
-        df = self.gsheet.read(self.spreadsheet_id, sheet_name, sheet_range)
-        return df
-
-    def fetch_processed_messages(self) -> set[int]:
-        sheet_name = "Telegram"
-        sheet_range = "A:B"
-        df = self.gsheet.read(self.spreadsheet_id, sheet_name, sheet_range)
-        return {int(i) for i in df["MsgId"].values if i}
-
     def fetch_gsheet_state(self):
         logger.info("Fetching GSheet state")
-        self.entries_df = self.fetch_entries()
-        self.accounts_df = self.fetch_accounts()
-        self.processed_msgs = self.fetch_processed_messages()
+        entries_df, accounts_df, telegram_df = self.gsheet.batch_read(
+            self.spreadsheet_id,
+            [("Entradas", "A:F"), ("Contas", "B2:C999"), ("Telegram", "A:B")]
+        )
+        self.entries_df = entries_df
+        self.accounts_df = accounts_df
+        self.processed_msgs = parse_msg_ids(telegram_df)
+        if {"Tipo", "Conta"}.issubset(accounts_df.columns):
+            mask = accounts_df["Tipo"].isin(("Asset", "Liability"))
+            self.accounts = frozenset(accounts_df.loc[mask, "Conta"].tolist())
+        else:
+            self.accounts = frozenset()
         logger.info("Finished fetching GSheet state")
 
     def clean_local_state(self):
         self.to_upload = []
         self.failed_to_parse = []
+        self.missing_accounts = []
         self.asked_for_help = []
-        del self.entries_df
-        del self.accounts_df
-        del self.processed_msgs
+        self.entries_df = None
+        self.accounts_df = None
+        self.processed_msgs = None
+        self.accounts = None
 
-    def upload_processed_messages(self):
+    def processed_messages_payload(self) -> tuple[str, str, list[list]]:
         sheet_name = "Telegram"
-        sheet_range = "A:B"
         data = (
             [[msg.id, "SUCCESS"] for msg in self.to_upload] +
             [[msg.id, "FAILURE"] for msg in self.failed_to_parse] +
+            [[msg.id, "NO_ACCOUNTS"] for msg in self.missing_accounts] +
             [[msg.id, "ASKED_FOR_HELP"] for msg in self.asked_for_help]
         )
-        self.gsheet.write(self.spreadsheet_id, sheet_name, sheet_range, data)
-
-    def upload_entries(self):
-
-        def dt_fmt(d: dt.date) -> str:
-            return f"{d.day:02}-{self.month_names[d.month]}.-{d.year}"
-
-        def dec_fmt(d: Decimal) -> str:
-            return str(d).replace(".", ",")
+        return sheet_name, "A:B", data
 
+    def entries_payload(self) -> tuple[str, str, list[list]]:
         sheet_name = "Entradas"
-        sheet_range = "A:F"
         data = []
         for m in self.to_upload:
-            data.extend([
-                [
-                    dt_fmt(m.date),
-                    m.counterparty,
-                    m.description,
-                    a,
-                    dec_fmt(p),
-                    m.id
-                ] for a, p in [("Despesa", m.price), (m.account, -m.price)]
-            ])
-        self.gsheet.write(self.spreadsheet_id, sheet_name, sheet_range, data)
+            date = dt_fmt(m.date, self.month_names)
+            data.append([date, m.counterparty, m.description, "Despesa",
+                         dec_fmt(m.price), m.id])
+            data.append([date, m.counterparty, m.description, m.account,
+                         dec_fmt(-m.price), m.id])
+        return sheet_name, "A:F", data
 
     def update_gsheet_state(self):
         logger.info("Uploading new data to GSheet")
-        self.upload_entries()
-        self.upload_processed_messages()
+        for sheet_name, sheet_range, data in (
+            self.entries_payload(),
+            self.processed_messages_payload()
+        ):
+            if data:
+                self.gsheet.write(
+                    self.spreadsheet_id, sheet_name, sheet_range, data
+                )
         logger.info("Finished uploading to GSheet")
 
-    def send_feedback_messages(self):
-        if not (self.to_upload or self.failed_to_parse or self.asked_for_help):
+    async def send_feedback_messages(self):
+        if not (self.to_upload or self.failed_to_parse or
+                self.missing_accounts or self.asked_for_help):
             return
 
         ok_msgs = "\n\n".join([f"\t-> {str(m)}" for m in self.to_upload])
         nok_msgs = "\n\n".join(
-            set(f"\t-> {m.text}" for m in self.failed_to_parse)
+            f"\t-> {t}"
+            for t in dict.fromkeys(m.text for m in self.failed_to_parse)
+        )
+        no_acc_msgs = "\n\n".join(
+            f"\t-> {t}"
+            for t in dict.fromkeys(m.text for m in self.missing_accounts)
         )
         success_text = "As seguintes mensagens foram registradas:"
         failure_text = ("As seguintes mensagens não foram registradas por "
                         "erro de formatação:")
+        no_acc_text = ("Nenhuma conta válida está configurada na planilha. "
+                       "As seguintes mensagens não foram registradas:")
 
-        if ok_msgs:
-            cur_year = dt.datetime.now().year
-            cur_month = dt.datetime.now().month
-            date_str = dt.datetime.now().strftime("%m/%Y")
-            spent = self.get_monthly_expenses(cur_year, cur_month)
+        if ok_msgs and self.monthly_summary:
+            now = dt.datetime.now()
+            date_str = now.strftime("%m/%Y")
+            spent = self.get_monthly_expenses(now.year, now.month)
             spent_text = (f"No mês {date_str} houveram {len(spent)} "
-                          f"despesas totalizando R$ {sum(spent)} gastos")
+                          f"despesas totalizando R$ {sum(spent):.2f} gastos")
         else:
             spent_text = ""
 
@@ -246,59 +296,73 @@ class ExpensesTracker(Tracker):
             self.text_header +
             (f"{success_text}\n\n{ok_msgs}\n\n\n" if ok_msgs else "") +
             (f"{failure_text}\n\n{nok_msgs}\n\n\n" if nok_msgs else "") +
+            (f"{no_acc_text}\n\n{no_acc_msgs}\n\n\n" if no_acc_msgs else "") +
             spent_text +
             "\n\n" +
             "Em caso de dúvidas, envie uma mensagem contendo o caractere '?'"
         )
-        if ok_msgs or nok_msgs:
-            self.send_telegram_message(self.chat_id, text, None)
+        to_send: list[tuple[int, str, Optional[int]]] = []
+        if ok_msgs or nok_msgs or no_acc_msgs:
+            to_send.append((self.chat_id, text, None))
         if self.asked_for_help:
-
-            accounts = set(self.accounts_df[self.accounts_df["Tipo"].isin(
-                ["Asset", "Liability"]
-            )]["Conta"].values.tolist())
-
-            valid_acc_text = f"\n\nContas válidas: {', '.join(accounts)}"
+            valid_acc_text = (
+                f"\n\nContas válidas: {', '.join(self.accounts)}"
+            )
             help_msg = self.text_header + self.help_message + valid_acc_text
-            self.send_telegram_message(
-                self.chat_id, help_msg, self.asked_for_help[-1].id
+            to_send.append(
+                (self.chat_id, help_msg, self.asked_for_help[-1].id)
             )
+        if to_send:
+            await self.send_telegram_messages(to_send)
 
-    def get_monthly_expenses(self, year: int, month: int) -> list[Decimal]:
-        self.fetch_gsheet_state()
-        df = self.entries_df.copy()
-        month_from_name = {v: k for k, v in self.month_names.items()}
-
-        def _replace(d: str) -> str:
-            for name in month_from_name:
-                d = d.replace(name, f"{month_from_name[name]:02}")
-            return d
-
-        df["Data"] = df["Data"].apply(lambda d: _replace(d))
-        df["RefDate"] = df["Data"].apply(
-            lambda d: dt.datetime.strptime(d, "%d-%m.-%Y").date()
+    def get_monthly_expenses(self, year: int, month: int) -> list[float]:
+        self.entries_df = self.fetch_entries()
+        df = self.entries_df
+        df = df.loc[df["Conta"] == "Despesa", ["Data", "Valor (R$)"]]
+        dates = pd.to_datetime(
+            df["Data"].str.replace(
+                _MONTH_RE, lambda m: _MONTH_TO_NUM[m.group(0)], regex=True
+            ),
+            format="%d-%m.-%Y"
         )
-        df["Month"] = df["RefDate"].apply(lambda d: d.month)
-        df["Year"] = df["RefDate"].apply(lambda d: d.year)
-
-        df["Values"] = df[
-            (df["Conta"] == "Despesa") &
-            (df["Month"] == month) &
-            (df["Year"] == year)
-        ]["Valor (R$)"].apply(
-            lambda v: Decimal(v.replace("R$ ", "").replace(",", "."))
+        mask = (dates.dt.month == month) & (dates.dt.year == year)
+        raw = df.loc[mask, "Valor (R$)"]
+        values = pd.to_numeric(
+            raw.str.replace("R$", "", regex=False)
+            .str.replace(".", "", regex=False)
+            .str.replace(",", ".", regex=False)
+            .str.strip(),
+            errors="coerce"
         )
-        return df[~df["Values"].isna()]["Values"].values.tolist()
+        invalid = values.isna()
+        if invalid.any():
+            logger.warning("Couldn't parse expense values: %s",
+                           raw[invalid].tolist())
+        return values[~invalid].tolist()
 
-    def run(self):
+    async def run_async(self):
         logger.info("Running %s", self.__class__.__name__)
-        self.fetch_gsheet_state()
-        self.process_received_messages()
-        self.update_gsheet_state()
-        self.send_feedback_messages()
+        async with self.telegram.client:
+            msgs, _ = await asyncio.gather(
+                self.fetch_telegram_messages(),
+                asyncio.to_thread(self.fetch_gsheet_state)
+            )
+            self.process_received_messages(msgs)
+            self.update_gsheet_state()
+            await self.send_feedback_messages()
         self.clean_local_state()
         logger.info("Finished running %s", self.__class__.__name__)
 
+    def run(self):
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+        self._loop.run_until_complete(self.run_async())
+
+    def close(self):
+        if self._loop is not None:
+            self._loop.close()
+            self._loop = None
+
 
 def load_and_run_trackers(
     trackers: list[Type[Tracker]],
@@ -311,7 +375,10 @@ def load_and_run_trackers(
     logger.info("Loaded all trackers")
     for tracker in t_objs:
         logger.info("Running tracker %s", tracker.__class__.__name__)
-        tracker.run()
+        try:
+            tracker.run()
+        finally:
+            tracker.close()
     logger.info("Finished running all trackers. Exiting")
 
 
@@ -1,6 +1,7 @@
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
 import datetime as dt
+from functools import lru_cache
 import logging
 import os.path
 from typing import Optional, Type
@@ -19,20 +20,46 @@ logger = logging.getLogger(__name__)
 GOOGLE_SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
 
 
+@lru_cache(maxsize=8)
+def _load_cfg(yaml_file_path: str) -> dict:
+    logger.debug("Parsing config file '%s'", yaml_file_path)
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    with open(yaml_file_path, "r", encoding="UTF-8") as f:
+        return yaml.load(f, Loader=loader)
+
+
 def load_chat_id(chat: str, yaml_file_path: str = "settings.yaml") -> int:
     logger.debug("Loading chat id for '%s' from '%s'", chat, yaml_file_path)
-    with open(yaml_file_path, "r", encoding="UTF-8") as f:
-        cfg = yaml.safe_load(f)
-        chat_id = cfg["telegram"]["chats"][chat]["id"]
-    return chat_id
+    cfg = _load_cfg(yaml_file_path)
+    return cfg["telegram"]["chats"][chat]["id"]
 
 
 def load_sheet_id(sheet: str, yaml_file_path: str = "settings.yaml") -> str:
     logger.debug("Loading sheet id for '%s' from '%s'", sheet, yaml_file_path)
-    with open(yaml_file_path, "r", encoding="UTF-8") as f:
-        cfg = yaml.safe_load(f)
-        sheet_id = cfg["google"]["sheets"][sheet]["id"]
-    return sheet_id
+    cfg = _load_cfg(yaml_file_path)
+    return cfg["google"]["sheets"][sheet]["id"]
+
+
+def load_sheet_option(sheet: str, option: str, default=None,
+                      yaml_file_path: str = "settings.yaml"):
+    logger.debug("Loading option '%s' of sheet '%s' from '%s'",
+                 option, sheet, yaml_file_path)
+    cfg = _load_cfg(yaml_file_path)
+    return cfg["google"]["sheets"][sheet].get(option, default)
+
+
+def values_to_df(values: list[list], includes_columns: bool = True
+                 ) -> pd.DataFrame:
+    df = pd.DataFrame(values)
+    if includes_columns and not df.empty:
+        df.columns = df.iloc[0]
+        df = df.drop(df.index[0])
+    return df
+
+
+def parse_msg_ids(df: pd.DataFrame) -> frozenset[int]:
+    ids = pd.to_numeric(df["MsgId"], errors="coerce").dropna()
+    return frozenset(ids.astype("int64").unique().tolist())
 
 
 def update_msgs_tz(msgs: list[Message]) -> None:
@@ -54,27 +81,27 @@ class TelegramConnection:
     @classmethod
     def from_yaml(cls, file_path: str = "settings.yaml"):
         logger.debug("Loading Telegram config from '%s'", file_path)
-        with open(file_path, "r", encoding="UTF-8") as f:
-            cfg = yaml.safe_load(f)
-            api_id = cfg["telegram"]["client"]["id"]
-            api_hash = cfg["telegram"]["client"]["hash"]
-            name = cfg["telegram"]["client"]["name"]
-            logger.debug("name: %s; id: %s, hash: %s",
-                         name, api_id, api_hash)
-            return cls(name, api_id, api_hash)
+        cfg = _load_cfg(file_path)
+        api_id = cfg["telegram"]["client"]["id"]
+        api_hash = cfg["telegram"]["client"]["hash"]
+        name = cfg["telegram"]["client"]["name"]
+        logger.debug("name: %s; id: %s, hash: %s",
+                     name, api_id, api_hash)
+        return cls(name, api_id, api_hash)
 
     async def send_msg(self, chat_id: int, txt: str, reply_to: Optional[int]):
-        async with self.client:
-            await self.client.send_message(
-                entity=chat_id,
-                message=txt,
-                reply_to=reply_to
-            )
+        await self.client.send_message(
+            entity=chat_id,
+            message=txt,
+            reply_to=reply_to
+        )
+
+    async def send_msgs(self, msgs: list[tuple[int, str, Optional[int]]]):
+        for chat_id, txt, reply_to in msgs:
+            await self.send_msg(chat_id, txt, reply_to)
 
     async def fetch_msgs(self, chat_id: int) -> list[Message]:
-        client = self.client
-        async with client:
-            msgs = list(await client.get_messages(chat_id, limit=100))
+        msgs = list(await self.client.get_messages(chat_id, limit=100))
         update_msgs_tz(msgs)
         return msgs
 
@@ -132,12 +159,17 @@ class GSheetConnection:
             spreadsheetId=gsheet_id,
             range=f"{sheet}!{sheet_range}"
         ).execute()
-        values = result.get("values", [])
-        df = pd.DataFrame(values)
-        if includes_columns and not df.empty:
-            df.columns = df.iloc[0]
-            df = df.drop(df.index[0])
-        return df
+        return values_to_df(result.get("values", []), includes_columns)
+
+    def batch_read(self, gsheet_id: str, ranges: list[tuple[str, str]],
+                   includes_columns: bool = True) -> list[pd.DataFrame]:
+        logger.debug("Reading ranges %s (%s)", ranges, gsheet_id)
+        result = self.sheets_svc.values().batchGet(
+            spreadsheetId=gsheet_id,
+            ranges=[f"{sheet}!{sheet_range}" for sheet, sheet_range in ranges]
+        ).execute()
+        return [values_to_df(vr.get("values", []), includes_columns)
+                for vr in result.get("valueRanges", [])]
 
     def write(self, gsheet_id: str, sheet: str, sheet_range: str,
               data: list[list]):
@@ -152,6 +184,7 @@ class GSheetConnection:
 
 
 class Tracker(ABC):
+    __slots__ = ()
     telegram: TelegramConnection
     gsheet: GSheetConnection
     name: str
@@ -180,10 +213,18 @@ class Tracker(ABC):
     def clean_local_state(self):
         pass
 
+    @abstractmethod
+    async def run_async(self):
+        pass
+
     @abstractmethod
     def run(self):
         pass
 
+    @abstractmethod
+    def close(self):
+        pass
+
     @classmethod
     @abstractmethod
     def from_yaml(self):